@@ -32,7 +32,9 @@ ALLOWED_CURRENCY_CODES = ['CAD', 'EUR', 'GBP', 'USD']
 ALLOWED_IMPACT_COLORS = ['red', 'orange', 'gray']
 
 # Timezone configuration
-SCRAPER_TIMEZONE = None         # This will be detected from Selenium
+SCRAPER_TIMEZONE = None         # Detected from the browser with --use-browser.
+                                # Plain HTTP scraping cannot detect it: pass --timezone or
+                                # set it here (e.g. "America/New_York") for time conversion.
 
 # Set this to the target timezone you'd like your output to be in.
 # If left as None, no conversion will happen.
@@ -1,89 +1,193 @@
+import os
+import copy
 import time
+import functools
+import random
+import calendar
+import asyncio
 import argparse
 import json
-import pandas as pd
+import httpx
+import pytz
+import lxml.html
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from config import ALLOWED_ELEMENT_TYPES, ICON_COLOR_MAP
-from utils import save_csv
+from utils import csv_path, save_csv
 import config
 from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 
+CALENDAR_URL = "https://www.forexfactory.com/calendar?month={}"
+_IMPACT_MARKER = "calendar__impact"
+_DETAIL_MARKER = "calendar__detail"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
-def init_driver(headless=True) -> webdriver.Chrome:
+# Resources the browser never needs to fetch for the calendar table
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.woff", "*.woff2", "*.ttf",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*",
+]
+
+# Full and abbreviated month names (lowercase) -> month number
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+
+# Resolved once per process; seeded from the CHROMEDRIVER_PATH env var when set
+_CHROMEDRIVER_PATH = None
+
+
+def _install_chromedriver():
+    """Resolve chromedriver through ChromeDriverManager and pin the result"""
+    global _CHROMEDRIVER_PATH
+    print("Attempting to initialize WebDriver with ChromeDriverManager...")
+    _CHROMEDRIVER_PATH = ChromeDriverManager().install()
+    # Worker processes inherit the environment and skip the lookup
+    os.environ["CHROMEDRIVER_PATH"] = _CHROMEDRIVER_PATH
+    return _CHROMEDRIVER_PATH
+
+
+def _chromedriver_path():
+    """Return the pinned chromedriver path, only asking ChromeDriverManager on a miss"""
+    global _CHROMEDRIVER_PATH
+    if _CHROMEDRIVER_PATH is None:
+        pinned = os.environ.get("CHROMEDRIVER_PATH")
+        if pinned and os.path.isfile(pinned):
+            _CHROMEDRIVER_PATH = pinned
+        else:
+            _install_chromedriver()
+    return _CHROMEDRIVER_PATH
+
+
+@functools.lru_cache(maxsize=2)
+def _build_options(headless=True) -> webdriver.ChromeOptions:
+    """Build the shared Chrome options; callers must copy before mutating"""
     options = webdriver.ChromeOptions()
+    # The table is in the initial HTML; return at DOMContentLoaded instead of
+    # waiting for every ad and analytics script (scrape_month waits for the table)
+    options.page_load_strategy = "eager"
     if headless:
         options.add_argument("--headless")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-gpu")
     options.add_argument("window-size=1920x1080")
-    options.add_argument(
-        "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    )
+    options.add_argument(f"--user-agent={USER_AGENT}")
+    # Only the table HTML is read, so don't spend bandwidth on images and notifications
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    return options
 
-    print("Attempting to initialize WebDriver with ChromeDriverManager...")
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    print("WebDriver initialized successfully using ChromeDriverManager.")
+
+def init_driver(headless=True) -> webdriver.Chrome:
+    # ChromeOptions is mutable, so hand each driver its own copy of the cached one
+    options = copy.deepcopy(_build_options(headless))
+
+    try:
+        driver = webdriver.Chrome(service=Service(_chromedriver_path()), options=options)
+    except SessionNotCreatedException as e:
+        # Pinned driver no longer matches the installed Chrome; re-resolve and retry once
+        print(f"[WARN] Could not start Chrome with {_CHROMEDRIVER_PATH}: {e}")
+        driver = webdriver.Chrome(service=Service(_install_chromedriver()), options=options)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    print("WebDriver initialized successfully.")
     return driver
 
 
 def scroll_to_end(driver):
-    previous_position = None
+    """Scroll to the bottom until the page height stops growing"""
+    get_height = "return document.body.scrollHeight"
+    last_height = driver.execute_script(get_height)
     while True:
-        current_position = driver.execute_script("return window.pageYOffset;")
-        driver.execute_script("window.scrollTo(0, window.pageYOffset + 500);")
-        time.sleep(2)
-        if current_position == previous_position:
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        try:
+            WebDriverWait(driver, 2, poll_frequency=0.25).until(
+                lambda d: d.execute_script(get_height) > last_height)
+        except TimeoutException:
             break
-        previous_position = current_position
-
-
-def parse_table(driver, month, year):
-    data = []
-    table = driver.find_element(By.CLASS_NAME, "calendar__table")
-
-    for row in table.find_elements(By.TAG_NAME, "tr"):
-        row_data = {}
-        event_id = row.get_attribute("data-event-id")
-
-        for element in row.find_elements(By.TAG_NAME, "td"):
-            class_name = element.get_attribute('class')
-
-            if class_name in ALLOWED_ELEMENT_TYPES:
-                class_name_key = ALLOWED_ELEMENT_TYPES.get(
-                    f"{class_name}", "cell")
-
-                if "calendar__impact" in class_name:
-                    impact_elements = element.find_elements(
-                        By.TAG_NAME, "span")
-                    color = None
-                    for impact in impact_elements:
-                        impact_class = impact.get_attribute("class")
-                        color = ICON_COLOR_MAP.get(impact_class)
-                    row_data[f"{class_name_key}"] = color if color else "impact"
-
-                elif "calendar__detail" in class_name and event_id:
-                    detail_url = f"https://www.forexfactory.com/calendar?month={month.lower()}.{year}#detail={event_id}"
-                    row_data[f"{class_name_key}"] = detail_url
-                elif class_name_key in ["forecast", "previous"]:
-                    value = element.get_attribute('innerText')
-                    value = value.strip() if value else ""
-                    row_data[f"{class_name_key}"] = value if value else "empty"
-                elif element.text:
-                    row_data[f"{class_name_key}"] = element.text
-                else:
-                    row_data[f"{class_name_key}"] = "empty"
+        last_height = driver.execute_script(get_height)
+
+
+def _cell_text(td):
+    """Visible-ish cell text: text nodes joined by single spaces, like innerText"""
+    return " ".join(t.strip() for t in td.itertext() if t.strip())
+
+
+def extract_rows(html):
+    """
+    Flatten the calendar table HTML into plain Python data.
+    Accepts either the table's own HTML or a full calendar page, and raises
+    ValueError straight away if there is no calendar table in it.
+    Returns an iterator of (event_id, cells) pairs, where cells is a list of
+    (class_name, text, span_classes) tuples for every <td> in the row.
+    """
+    root = lxml.html.fromstring(html)
+    tables = root.find_class("calendar__table")
+    if not tables:
+        raise ValueError("calendar table not found")
+    return _iter_rows(tables[0])
+
+
+def _iter_rows(table):
+    for row in table.iter("tr"):
+        cells = [
+            (td.get("class"), _cell_text(td),
+             [span.get("class") for span in td.iter("span")])
+            for td in row.iter("td")
+        ]
+        yield row.get("data-event-id"), cells
+
+
+def _handle_impact(text, span_classes, event_id, month, year):
+    return next((ICON_COLOR_MAP[c] for c in span_classes if c in ICON_COLOR_MAP), "impact")
+
+
+def _handle_default(text, span_classes, event_id, month, year):
+    return text if text else "empty"
+
+
+def _handle_detail(text, span_classes, event_id, month, year):
+    if event_id:
+        return f"https://www.forexfactory.com/calendar?month={month.lower()}.{year}#detail={event_id}"
+    return _handle_default(text, span_classes, event_id, month, year)
+
+
+# Cell class attribute -> value handler, so each cell costs one dict lookup
+_HANDLERS = {
+    cls: (_handle_impact if _IMPACT_MARKER in cls
+          else _handle_detail if _DETAIL_MARKER in cls
+          else _handle_default)
+    for cls in ALLOWED_ELEMENT_TYPES
+}
+
+
+def parse_rows(rows, month, year):
+    """Yield one row dict per extracted row that has any allowed cells"""
+    for event_id, cells in rows:
+        row_data = {
+            ALLOWED_ELEMENT_TYPES[class_name]: handler(text, span_classes, event_id, month, year)
+            for class_name, text, span_classes in cells
+            if (handler := _HANDLERS.get(class_name)) is not None
+        }
 
         if row_data:
-            data.append(row_data)
+            yield row_data
 
-    save_csv(data, month, year)
 
-    return data, month
+def parse_table(html, month, year):
+    """Parse the calendar HTML and stream its rows straight into the month's CSV"""
+    # Extract first so a page without the table fails before any file is touched
+    rows = extract_rows(html)
+    return save_csv(parse_rows(rows, month, year), month, year)
 
 
 def get_target_month(arg_month=None):
@@ -94,18 +198,11 @@ def get_target_month(arg_month=None):
 
 def generate_month_range(start_date, end_date):
     """Generate a list of (month, year) tuples between start_date and end_date"""
-    months = []
-    current = start_date.replace(day=1)  # Start from first day of the month
-    
-    while current <= end_date:
-        months.append((current.strftime("%B"), current.year))
-        # Move to next month
-        if current.month == 12:
-            current = current.replace(year=current.year + 1, month=1)
-        else:
-            current = current.replace(month=current.month + 1)
-    
-    return months
+    # Imported here so runs that never scrape a range don't pay for loading pandas
+    import pandas as pd
+
+    month_starts = pd.date_range(start_date.replace(day=1), end_date, freq="MS")
+    return [(d.strftime("%B"), d.year) for d in month_starts]
 
 
 def parse_month_year_string(date_str):
@@ -119,15 +216,9 @@ def parse_month_year_string(date_str):
         month_str, year_str = parts
         year = int(year_str)
         
-        # Try full month name first
-        try:
-            month_num = datetime.strptime(month_str.capitalize(), "%B").month
-        except ValueError:
-            # Try abbreviated month name
-            try:
-                month_num = datetime.strptime(month_str.capitalize(), "%b").month
-            except ValueError:
-                raise ValueError(f"Invalid month: {month_str}")
+        month_num = _MONTHS.get(month_str.lower())
+        if month_num is None:
+            raise ValueError(f"Invalid month: {month_str}")
         
         return datetime(year, month_num, 1)
         
@@ -135,32 +226,132 @@ def parse_month_year_string(date_str):
         raise ValueError(f"Invalid date format: {date_str}. Use format like 'jan 2007' or 'january 2007'")
 
 
-def scrape_month(month, year, url_param=None):
-    """Scrape a single month"""
+def is_cached(month, year):
+    """Past months never change, so an existing non-empty CSV can be reused"""
+    month_num = _MONTHS.get(month.lower())
+    if month_num is None:
+        return False
+    now = datetime.now()
+    if (int(year), month_num) >= (now.year, now.month):
+        return False
+    path = csv_path(month, str(year))
+    return os.path.exists(path) and os.path.getsize(path) > 100
+
+
+def month_url(month, year, url_param=None):
+    """Build the calendar URL for a month, or for a raw param like 'this'"""
     if url_param:
-        url = f"https://www.forexfactory.com/calendar?month={url_param}"
-    else:
-        month_abbr = month[:3].lower()
-        url = f"https://www.forexfactory.com/calendar?month={month_abbr}.{year}"
-    
+        return CALENDAR_URL.format(url_param)
+    return CALENDAR_URL.format(f"{month[:3].lower()}.{year}")
+
+
+def _parse_logged(html, month, year):
+    try:
+        parse_table(html, month, str(year))
+    except Exception as e:
+        print(f"[ERROR] Failed to parse {month} {year}: {e}")
+
+
+def scrape_month(month, year, url_param=None, driver=None, parse_executor=None):
+    """
+    Scrape a single month in the browser, reusing `driver` if one is given.
+    With a `parse_executor`, parsing and CSV writing are handed off to it so the
+    caller can navigate to the next month while this one is being processed.
+    """
+    url = month_url(month, year, url_param)
     print(f"\n[INFO] Navigating to {url}")
 
-    driver = init_driver()
+    owns_driver = driver is None
+    if owns_driver:
+        driver = init_driver()
     try:
         driver.get(url)
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CLASS_NAME, "calendar__table")))
         detected_tz = driver.execute_script("return Intl.DateTimeFormat().resolvedOptions().timeZone")
         print(f"[INFO] Browser timezone: {detected_tz}")
         config.SCRAPER_TIMEZONE = detected_tz
         scroll_to_end(driver)
 
         print(f"[INFO] Scraping data for {month} {year}")
-        parse_table(driver, month, str(year))
+        # Pull the whole table in one WebDriver round-trip and walk it in-process
+        html = driver.execute_script(
+            "return document.getElementsByClassName('calendar__table')[0].outerHTML")
+        if parse_executor is None:
+            parse_table(html, month, str(year))
+        else:
+            parse_executor.submit(_parse_logged, html, month, year)
         
     except Exception as e:
         print(f"[ERROR] Failed to scrape {month} {year}: {e}")
+    finally:
+        if owns_driver:
+            driver.quit()
+
+
+def _scrape_batch(jobs):
+    """Scrape a batch of (month, year, url_param) jobs with one browser"""
+    driver = init_driver()
+    try:
+        # Parse each month in the background while the browser loads the next one
+        with ThreadPoolExecutor(max_workers=1) as parse_executor:
+            for month, year, url_param in jobs:
+                scrape_month(month, year, url_param, driver, parse_executor)
     finally:
         driver.quit()
-        time.sleep(3)
+
+
+def _scrape_batch_staggered(jobs):
+    """Pool entry point: stagger start-up a little so workers don't hit the site in lock-step"""
+    time.sleep(random.uniform(0, 0.5))
+    _scrape_batch(jobs)
+
+
+def scrape_with_browser(jobs, workers):
+    """Scrape jobs with Selenium, spreading them over `workers` browser processes"""
+    workers = max(1, min(workers, len(jobs)))
+    if workers == 1:
+        _scrape_batch(jobs)
+        return
+
+    # Each worker drives its own Chrome, so use processes rather than threads.
+    # Jobs are dealt out round-robin so every worker starts its browser once,
+    # and the driver path is resolved here so workers inherit it.
+    _chromedriver_path()
+    batches = [jobs[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_scrape_batch_staggered, batches))
+
+
+async def fetch_month(client, month, year, url_param=None):
+    """Fetch the server-rendered calendar page for a month"""
+    url = month_url(month, year, url_param)
+    print(f"[INFO] Fetching {url}")
+    response = await client.get(url)
+    response.raise_for_status()
+    return response.text
+
+
+async def _scrape_month_http(client, semaphore, month, year, url_param=None):
+    try:
+        async with semaphore:
+            html = await fetch_month(client, month, year, url_param)
+        print(f"[INFO] Scraping data for {month} {year}")
+        # Parse off the event loop so other fetches keep progressing meanwhile
+        await asyncio.to_thread(parse_table, html, month, str(year))
+    except Exception as e:
+        print(f"[ERROR] Failed to scrape {month} {year}: {e}")
+
+
+async def scrape_with_http(jobs, workers):
+    """Scrape jobs over HTTP, with at most `workers` requests in flight"""
+    semaphore = asyncio.Semaphore(max(1, workers))
+    async with httpx.AsyncClient(http2=True, follow_redirects=True, timeout=30,
+                                 headers={"User-Agent": USER_AGENT}) as client:
+        await asyncio.gather(*(
+            _scrape_month_http(client, semaphore, month, year, url_param)
+            for month, year, url_param in jobs
+        ))
 
 
 def main():
@@ -172,6 +363,14 @@ def main():
                         help='Start month for range scraping (e.g., "jan 2007", "january 2007")')
     parser.add_argument("--end", 
                         help='End month for range scraping (e.g., "jun 2007", "june 2007")')
+    parser.add_argument("--workers", type=int, default=4,
+                        help='Number of months to scrape in parallel (default: 4)')
+    parser.add_argument("--use-browser", action="store_true",
+                        help='Scrape with Selenium/Chrome instead of plain HTTP requests')
+    parser.add_argument("--timezone",
+                        help='Timezone the calendar times are shown in when scraping over HTTP (e.g. "America/New_York")')
+    parser.add_argument("--force", action="store_true",
+                        help='Re-scrape past months even if their CSV already exists')
 
     args = parser.parse_args()
 
@@ -187,10 +386,8 @@ def main():
             
             print(f"[INFO] Scraping date range: {start_date.strftime('%B %Y')} to {end_date.strftime('%B %Y')}")
             
-            months_to_scrape = generate_month_range(start_date, end_date)
-            
-            for month, year in months_to_scrape:
-                scrape_month(month, year)
+            jobs = [(month, year, None)
+                    for month, year in generate_month_range(start_date, end_date)]
                 
         except ValueError as e:
             print(f"[ERROR] {e}")
@@ -200,6 +397,7 @@ def main():
     elif args.months is not None or (not args.start and not args.end):
         month_params = args.months if args.months else ["this"]
 
+        jobs = []
         for param in month_params:
             param = param.lower()
             
@@ -208,19 +406,49 @@ def main():
                 now = datetime.now()
                 month = now.strftime("%B")
                 year = now.year
-                scrape_month(month, year, param)
             elif param == "next":
                 now = datetime.now()
                 next_month = (now.month % 12) + 1
                 year = now.year if now.month < 12 else now.year + 1
                 month = datetime(year, next_month, 1).strftime("%B")
-                scrape_month(month, year, param)
             else:
                 month = param.capitalize()
                 year = datetime.now().year
-                scrape_month(month, year, param)
-    
+            jobs.append((month, year, param))
+
+    else:
         print("[ERROR] Please provide both --start and --end together for date range scraping. Only one was provided.")
+        return
+
+    if not args.force:
+        pending = []
+        for month, year, url_param in jobs:
+            if is_cached(month, year):
+                print(f"[SKIP] cached {csv_path(month, year)}")
+            else:
+                pending.append((month, year, url_param))
+        jobs = pending
+        if not jobs:
+            print("[INFO] Nothing to scrape, all months are cached. Use --force to re-scrape.")
+            return
+
+    if not args.use_browser:
+        # Only the browser can detect the page timezone; over HTTP it must be given
+        if args.timezone:
+            try:
+                pytz.timezone(args.timezone)
+            except pytz.UnknownTimeZoneError:
+                print(f"[ERROR] Unknown timezone: {args.timezone}")
+                return
+            config.SCRAPER_TIMEZONE = args.timezone
+        if config.TARGET_TIMEZONE and not config.SCRAPER_TIMEZONE:
+            print(f"[WARN] TARGET_TIMEZONE is {config.TARGET_TIMEZONE} but the source timezone is unknown, "
+                  "so times will not be converted. Pass --timezone or set SCRAPER_TIMEZONE in config.py.")
+
+    if args.use_browser:
+        scrape_with_browser(jobs, args.workers)
+    else:
+        asyncio.run(scrape_with_http(jobs, args.workers))
 
 
 if __name__ == "__main__":
@@ -1,11 +1,21 @@
 import os
 import re
+import csv
 import json
 import pytz
-import pandas as pd
+import tempfile
 from datetime import datetime
 import config
 
+# Output columns: the original news/*.csv header order, with the newer
+# "detail" column placed right after "event"
+CSV_FIELDNAMES = ["date", "time", "currency", "impact", "event", "detail",
+                  "actual", "forecast", "previous", "day"]
+
+# Every parsed label must have a column, or DictWriter fails partway through a month
+assert set(config.ALLOWED_ELEMENT_TYPES.values()) <= set(CSV_FIELDNAMES), \
+    "CSV_FIELDNAMES is missing a label from config.ALLOWED_ELEMENT_TYPES"
+
 
 def read_json(path):
     """
@@ -44,10 +54,18 @@ def extract_date_parts(text, year):
 
 
 def reformat_data(data: list, year: str) -> list:
+    return list(iter_reformat_data(data, year))
+
+
+def iter_reformat_data(data, year: str):
+    """
+    Lazily reformat scraped rows, carrying date/time forward across rows.
+    Args: data (iterable): Raw row dicts from the scraper. year (str): The year being scraped.
+    Yields: dict: One structured row per event.
+    """
     current_date = ''
     current_time = ''
     current_day = ''
-    structured_rows = []
 
     for row in data:
         new_row = row.copy()
@@ -87,17 +105,43 @@ def reformat_data(data: list, year: str) -> list:
             if value == "empty":
                 new_row[key] = ""
 
-        structured_rows.append(new_row)
+        yield new_row
+
 
-    return structured_rows
+def csv_path(month, year):
+    return f"news/{month}_{year}_news.csv"
 
 
 def save_csv(data, month, year):
-    structured_rows = reformat_data(data, year)
-    header = list(structured_rows[0].keys())
-    df = pd.DataFrame(structured_rows, columns=header)
+    """
+    Stream rows into news/{month}_{year}_news.csv as they are reformatted.
+    Rows go to a private .part file that only replaces the CSV once it is
+    complete, so an interrupted scrape never looks like a finished month and
+    concurrent writers of the same month never share a temp file.
+    Args: data (iterable): Raw row dicts, e.g. a generator from the parser.
+    """
     os.makedirs("news", exist_ok=True)
-    df.to_csv(f"news/{month}_{year}_news.csv", index=False)
+    path = csv_path(month, year)
+    fd, part_path = tempfile.mkstemp(dir="news", prefix=f"{month}_{year}_", suffix=".part")
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDNAMES, lineterminator="\n")
+            writer.writeheader()
+            written = 0
+            for row in iter_reformat_data(data, year):
+                writer.writerow(row)
+                written += 1
+        if not written:
+            # An empty or blocked page must not replace a good month with a bare header
+            raise ValueError("no calendar rows")
+        # mkstemp creates the file owner-only; keep the CSV readable like before
+        os.chmod(part_path, 0o644)
+        os.replace(part_path, path)
+    except BaseException:
+        # Don't leave a half-written month lying around
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
     return True
 
 